@@ -0,0 +1 @@
+# Корень репозитория в sys.path: тесты импортируют scrapy.py как модуль scrapy
@@ -0,0 +1,24 @@
+import pandas as pd
+
+import scrapy
+
+
+def test_empty_input():
+    """Пустой вход дает пустые колонки и нулевой анализ, а не TypeError"""
+    columns = scrapy.vacancies_to_columns([])
+    assert len(columns) == 0
+    assert columns['skills'].shape == (0, 1)
+
+    for vacancies in ([], pd.DataFrame(columns=['id', 'salary', 'skills'])):
+        result = scrapy.analyze_vacancies(vacancies, cube=True, cooccurrence=True)
+        assert result.total_vacancies == 0
+        assert not result.technologies and not result.salaries_by_exp
+        assert result.cooccurrence.total == 0
+
+
+def test_generate_zero_vacancies():
+    """Генерация 0 вакансий - пустой набор со словарями категорий генератора"""
+    vacancies = scrapy.generate_realistic_vacancies(0)
+    assert len(vacancies) == 0
+    assert vacancies.columns.categories['experience'] == scrapy.EXP_LEVELS
+    assert scrapy.analyze_vacancies(vacancies).total_vacancies == 0
@@ -0,0 +1,14 @@
+import pytest
+
+import scrapy
+
+
+def test_measure_startup():
+    """Время импорта - по строке модуля в -X importtime; без нее - понятная ошибка"""
+    timings, loaded = scrapy.measure_startup(repeat=1)
+    assert len(timings) == 1 and timings[0] > 0
+    assert 'pandas' not in loaded
+
+    # sys уже загружен интерпретатором, его строки в выводе нет
+    with pytest.raises(RuntimeError, match="'sys'"):
+        scrapy.measure_startup('sys', repeat=1)
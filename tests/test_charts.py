@@ -0,0 +1,31 @@
+import pytest
+
+import scrapy
+
+matplotlib = pytest.importorskip('matplotlib')
+
+
+@pytest.fixture
+def published():
+    scrapy.reset_analysis_state()
+    analyzer = scrapy.StreamingAnalyzer(trend_window='week')
+    analyzer.update(scrapy.generate_realistic_vacancies(500, seed=12, days=60))
+    scrapy.publish_analysis(analyzer.snapshot())
+    scrapy.publish_trends(analyzer.trends)
+    yield
+    scrapy.reset_analysis_state()
+
+
+def test_render_charts_headless(published, tmp_path):
+    """Все графики рендерятся в файлы без окна: в процессе и в пуле процессов"""
+    backend = matplotlib.get_backend()
+    paths = scrapy.render_charts(tmp_path / 'serial', ('png', 'svg'), workers=1)
+    assert len(paths) == 2 * len(scrapy.PLOTS)
+    assert matplotlib.get_backend() == backend
+
+    parallel = scrapy.render_charts(tmp_path / 'parallel', ('png',), workers=2)
+    assert sorted(path.rsplit('/', 1)[1] for path in parallel) == \
+        sorted(path.rsplit('/', 1)[1] for path in paths if path.endswith('.png'))
+    for path in parallel:
+        with open(path, 'rb') as f:
+            assert f.read(8) == b'\x89PNG\r\n\x1a\n'
@@ -0,0 +1,27 @@
+import os
+import subprocess
+import sys
+
+import scrapy
+
+
+def test_import_does_not_load_heavy_modules():
+    """Импорт модуля не тянет pandas, matplotlib и другие тяжелые библиотеки"""
+    code = 'import sys, scrapy; print(",".join(m for m in scrapy.LAZY_MODULES if m in sys.modules))'
+    process = subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(scrapy.__file__),
+                             capture_output=True, text=True, check=True)
+    assert process.stdout.strip() == ''
+
+
+def test_subcommands():
+    """Без подкоманды выполняется run; у подкоманд свои аргументы"""
+    assert scrapy.parse_args([]).command == 'run'
+    assert scrapy.parse_args(['--count', '10']).count == 10
+    args = scrapy.parse_args(['generate', '--count', '5', '--output', 'out.jsonl'])
+    assert (args.command, args.count, args.output) == ('generate', 5, 'out.jsonl')
+    assert not hasattr(scrapy.parse_args(['analyze']), 'output')
+
+
+def test_analyze_command(capsys):
+    assert scrapy.main(['analyze', '--count', '50', '--trends', 'none']) == 0
+    assert 'Вакансий: 50' in capsys.readouterr().out
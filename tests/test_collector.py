@@ -0,0 +1,183 @@
+import asyncio
+import socket
+import time
+
+import numpy as np
+import pytest
+
+import scrapy
+
+pytest.importorskip('aiohttp')
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _collect(vacancies, cache_path, ttl, port=0):
+    server, url = scrapy.start_stub_hh_server(vacancies, port=port)
+    config = scrapy.CollectorConfig(cache_path=cache_path)
+    config.BASE_URL, config.CACHE_TTL = url, ttl
+    config.RATE = config.BURST = 1000
+    collector = scrapy.AsyncHHCollector(config, scrapy.PerfRecorder())
+    try:
+        asyncio.run(collector.collect(None, 100))
+    finally:
+        server.shutdown()
+        server.server_close()
+    return collector.recorder.counters['cache']
+
+
+def test_response_cache_key():
+    """Ключ кэша - URL с хостом и портом, параметры в отсортированном порядке"""
+    assert scrapy.ResponseCache.key('http://127.0.0.1:8080/vacancies/1') == 'http://127.0.0.1:8080/vacancies/1'
+    assert scrapy.ResponseCache.key('https://api.hh.ru/vacancies', {'page': 1, 'area': 1}) == \
+        'https://api.hh.ru/vacancies?area=1&page=1'
+    assert scrapy.ResponseCache.key('http://127.0.0.1:8080/vacancies/1') != \
+        scrapy.ResponseCache.key('http://127.0.0.1:8081/vacancies/1')
+
+
+def test_cache_counts_across_runs(tmp_path):
+    """Кэш переживает перезапуск заглушки на том же порту; устаревшая запись с новым телом - промах"""
+    vacancies = scrapy.generate_realistic_vacancies(20, seed=1)
+    path = tmp_path / 'cache.db'
+    port = _free_port()
+
+    assert _collect(vacancies, path, 3600, port)['misses'] == 20
+    assert _collect(vacancies, path, 3600, port)['hits'] == 20
+    assert _collect(vacancies, path, 0, port)['revalidated'] == 20
+
+    changed = [dict(vacancy, title='Rust разработчик') for vacancy in vacancies]
+    stats = _collect(changed, path, 0, port)
+    assert (stats['misses'], stats['revalidated'], stats['hits']) == (20, 0, 0)
+
+    # Другой хост - другие записи
+    assert _collect(vacancies, path, 3600)['misses'] == 20
+
+
+def _crawl(vacancies, state_path):
+    server, url = scrapy.start_stub_hh_server(vacancies)
+    config = scrapy.CollectorConfig(state_path=state_path, trend_window='week')
+    config.BASE_URL = url
+    config.RATE = config.BURST = 1000
+    collector = scrapy.AsyncHHCollector(config)
+    try:
+        analyzer = asyncio.run(collector.collect(None, 7))
+    finally:
+        server.shutdown()
+        server.server_close()
+    return collector, analyzer
+
+
+def test_collector_rebuilds_after_changed_vacancy(tmp_path):
+    """Изменившаяся вакансия вычитается из агрегатов, квантили и min/max пересобираются"""
+    vacancies = [dict(vacancy, salary='100000-200000 руб.', experience='1-3 года')
+                 for vacancy in scrapy.generate_realistic_vacancies(30, seed=2)]
+    path = tmp_path / 'state.db'
+    _crawl(vacancies, path)
+    vacancies[0] = dict(vacancies[0], salary='500000 руб.')
+    _, analyzer = _crawl(vacancies, path)
+
+    stats = analyzer.salaries['1-3 года']
+    assert stats.count == 30 and not stats.stale
+    assert (stats.min, stats.max) == (150_000, 500_000)
+    assert np.isfinite(stats.median)
+    assert not analyzer.cube.stale and analyzer.cube.rollup()['max'] == 500_000
+
+    state = scrapy.CrawlState(path)
+    try:
+        saved = state.load_analyzer('week')
+    finally:
+        state.close()
+    assert not saved.cube.stale and not saved.salaries['1-3 года'].stale
+
+
+def test_second_crawl_skips_unchanged_vacancies(tmp_path):
+    """Повторный обход (заглушка на другом порту) загружает детали только изменившейся вакансии"""
+    vacancies = [dict(vacancy) for vacancy in scrapy.generate_realistic_vacancies(30, seed=3)]
+    path = tmp_path / 'state.db'
+    first, _ = _crawl(vacancies, path)
+    assert (first.stats['vacancies'], first.stats['skipped']) == (30, 0)
+
+    second, analyzer = _crawl(vacancies, path)
+    assert (second.stats['vacancies'], second.stats['skipped']) == (0, 30)
+    assert analyzer.total_vacancies == 30
+
+    vacancies[0] = dict(vacancies[0], title='Rust разработчик')
+    third, analyzer = _crawl(vacancies, path)
+    assert (third.stats['vacancies'], third.stats['skipped']) == (1, 29)
+    assert analyzer.total_vacancies == 30
+
+
+def _run(vacancies, batch_size=100, analyzer=None, stub=None, **config):
+    server, url = scrapy.start_stub_hh_server(vacancies, **(stub or {}))
+    config = scrapy.CollectorConfig(**{'rate': 1000, 'burst': 1000, **config})
+    config.BASE_URL = url
+    collector = scrapy.AsyncHHCollector(config)
+    start = time.perf_counter()
+    try:
+        analyzer = asyncio.run(collector.collect(analyzer, batch_size))
+    finally:
+        server.shutdown()
+        server.server_close()
+    return collector, analyzer, server.stats, time.perf_counter() - start
+
+
+@pytest.mark.parametrize('status', [500, 503])
+def test_collector_retries_server_errors(status):
+    """Ответы 5xx повторяются, все вакансии в итоге собираются"""
+    vacancies = scrapy.generate_realistic_vacancies(20, seed=4)
+    collector, analyzer, stats, _ = _run(vacancies, stub={'fail_every': 3, 'fail_status': status}, backoff=0.01)
+    assert analyzer.total_vacancies == 20
+    assert collector.stats['errors'] == 0 and collector.stats['retries'] > 0
+    assert stats['requests'] == 21 + collector.stats['retries']
+
+
+def test_collector_backoff_and_retry_after():
+    """Задержка повтора растет экспоненциально, 429 ждет не меньше Retry-After; после RETRIES - отказ"""
+    vacancies = scrapy.generate_realistic_vacancies(1, seed=4)
+    collector, analyzer, stats, elapsed = _run(vacancies, stub={'fail_every': 1}, backoff=0.1, retries=2)
+    # Задержки 0.1 и 0.2 с множителем джиттера от 0.5: вместе не меньше 0.15 с
+    assert elapsed >= 0.15
+    assert (collector.stats['requests'], collector.stats['retries'], collector.stats['errors']) == (3, 2, 1)
+    assert analyzer.total_vacancies == 0
+
+    collector, _, _, elapsed = _run(vacancies, stub={'fail_every': 1, 'fail_status': 429}, backoff=0.01, retries=1)
+    assert elapsed >= 1.0
+    assert (collector.stats['requests'], collector.stats['retries']) == (2, 1)
+
+
+def test_collector_rate_limit():
+    """Token bucket: не больше RATE запросов в секунду сверх BURST"""
+    vacancies = scrapy.generate_realistic_vacancies(20, seed=5)
+    collector, analyzer, _, elapsed = _run(vacancies, rate=20, burst=1)
+    assert analyzer.total_vacancies == 20
+    # 21 запрос (выдача и детали): первый по запасу, остальные - по 1/20 с
+    assert collector.stats['requests'] == 21
+    assert elapsed >= 0.95
+
+
+def test_collector_bounded_concurrency():
+    """Одновременно выполняется не больше CONCURRENCY запросов"""
+    vacancies = scrapy.generate_realistic_vacancies(30, seed=6)
+    _, analyzer, stats, _ = _run(vacancies, stub={'delay': 0.05}, concurrency=3)
+    assert analyzer.total_vacancies == 30
+    assert 2 <= stats['max_active'] <= 3
+
+
+def test_collector_streams_batches_into_analyzer():
+    """Вакансии передаются в анализатор пачками по batch_size по мере загрузки"""
+    class Recording(scrapy.StreamingAnalyzer):
+        def update(self, batch):
+            sizes.append(len(batch))
+            return super().update(batch)
+
+    sizes = []
+    vacancies = scrapy.generate_realistic_vacancies(30, seed=7)
+    _, analyzer, _, _ = _run(vacancies, batch_size=7, analyzer=Recording())
+    assert sizes == [7, 7, 7, 7, 2]
+    reference = scrapy.StreamingAnalyzer().update(vacancies)
+    assert analyzer.total_vacancies == 30
+    assert analyzer.technologies == reference.technologies
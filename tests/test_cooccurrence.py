@@ -0,0 +1,59 @@
+from collections import Counter
+from itertools import combinations
+
+import numpy as np
+import pytest
+
+import scrapy
+
+
+@pytest.fixture
+def vacancies():
+    return [vacancy.to_dict() for vacancy in scrapy.generate_realistic_vacancies(1_500, seed=17)]
+
+
+def _itemset_counts(vacancies, max_len):
+    counts = Counter()
+    for vacancy in vacancies:
+        skills = sorted(set(vacancy['skills']))
+        for size in range(1, max_len + 1):
+            counts.update(frozenset(items) for items in combinations(skills, size))
+    return counts
+
+
+def test_matrix_matches_pair_counts(vacancies):
+    """Матрица пар и lift совпадают с прямым подсчетом по вакансиям"""
+    stats = scrapy.SkillCooccurrence.from_columns(vacancies)
+    names = list(stats.names)
+    counts = _itemset_counts(vacancies, 2)
+    matrix = stats.matrix()
+    for (a, b), value in np.ndenumerate(matrix):
+        assert value == counts[frozenset({names[a], names[b]})]
+    top = stats.top_pairs(5)
+    assert [pair['count'] for pair in top] == sorted((count for items, count in counts.items() if len(items) == 2),
+                                                     reverse=True)[:5]
+    first = top[0]
+    a, b = (counts[frozenset({name})] for name in first['items'])
+    assert first['lift'] == pytest.approx(first['count'] * len(vacancies) / (a * b))
+
+
+def test_frequent_itemsets_match_brute_force(vacancies):
+    """FP-growth находит ровно наборы с support не ниже порога"""
+    stats = scrapy.SkillCooccurrence.from_columns(vacancies)
+    found = {frozenset(itemset['items']): itemset['count'] for itemset in stats.frequent_itemsets(0.02, max_len=3)}
+    expected = {items: count for items, count in _itemset_counts(vacancies, 3).items()
+                if count >= 0.02 * len(vacancies)}
+    assert found == expected
+    assert all(len(itemset['items']) >= 2 for itemset in stats.frequent_itemsets(0.02, max_len=3, min_len=2))
+
+
+def test_merge_and_subtract(vacancies):
+    """Слияние частей равно целому, вычитание части возвращает остаток"""
+    whole = scrapy.SkillCooccurrence.from_columns(vacancies)
+    first = scrapy.SkillCooccurrence.from_columns(vacancies[:500])
+    rest = scrapy.SkillCooccurrence.from_columns(vacancies[500:])
+    merged = first.copy().merge(rest)
+    assert np.array_equal(merged.matrix(), whole.matrix())
+    assert np.allclose(merged.salary_matrix(), whole.salary_matrix(), equal_nan=True)
+    assert np.array_equal(whole.copy().subtract(first).matrix(), rest.matrix())
+    assert whole.total == len(vacancies)
@@ -0,0 +1,112 @@
+import numpy as np
+
+import scrapy
+
+
+def _batch(salary, count=200):
+    return [{'id': i, 'title': 'Python разработчик', 'company': 'Яндекс', 'salary': f'{salary}-{salary} руб.',
+             'experience': '1-3 года', 'employment': 'Полная занятость', 'description': 'Python',
+             'skills': ['Python'], 'timestamp': '2026-10-01T10:00:00'} for i in range(count)]
+
+
+def test_changed_salaries_rebuild_quantiles(tmp_path):
+    """Повторный обход с новыми зарплатами: медиана, min/max и тренды - по новым значениям"""
+    path = tmp_path / 'state.db'
+    for salary in (100_000, 300_000):
+        state = scrapy.CrawlState(path)
+        analyzer = scrapy.analyze_incremental([_batch(salary)], state, trend_window='week')
+        state.close()
+
+    stats = analyzer.salaries['1-3 года']
+    assert stats.count == 200
+    assert not stats.stale
+    assert (stats.mean, stats.median, stats.min, stats.max) == (300_000, 300_000, 300_000, 300_000)
+    assert analyzer.cube.rollup()['min'] == 300_000
+    window = next(iter(analyzer.trends.windows.values()))
+    assert window.salaries['experience']['1-3 года'].median == 300_000
+
+
+def test_retract_marks_quantiles_stale():
+    """Без пересборки после вычитания квантили и min/max не публикуются"""
+    analyzer = scrapy.StreamingAnalyzer().update(_batch(100_000))
+    analyzer.retract(_batch(100_000, count=10))
+
+    stats = analyzer.salaries['1-3 года']
+    assert stats.count == 190
+    assert stats.stale
+    assert np.isnan(stats.median) and np.isnan(stats.min) and np.isnan(stats.max)
+    assert np.isnan(analyzer.cube.rollup()['max'])
+
+
+def test_state_round_trip_and_rebuild(tmp_path):
+    """Агрегаты сохраняются явным словарем состояния; без него пересобираются по сводкам"""
+    path = tmp_path / 'state.db'
+    state = scrapy.CrawlState(path)
+    analyzer = scrapy.analyze_incremental([scrapy.generate_realistic_vacancies(500, seed=2)], state,
+                                          trend_window='week')
+    state.close()
+
+    state = scrapy.CrawlState(path)
+    loaded = state.load_analyzer('week')
+    assert loaded.total_vacancies == analyzer.total_vacancies
+    assert loaded.technologies == analyzer.technologies
+    assert {level: stats.median for level, stats in loaded.salaries.items()} == \
+        {level: stats.median for level, stats in analyzer.salaries.items()}
+    assert loaded.trends.to_dict() == analyzer.trends.to_dict()
+    assert loaded.cube.to_dict(('experience',)) == analyzer.cube.to_dict(('experience',))
+
+    state.db.execute('DELETE FROM meta')
+    rebuilt = state.load_analyzer('week')
+    state.close()
+    assert rebuilt.total_vacancies == analyzer.total_vacancies
+    assert rebuilt.salaries['1-3 года'].count == analyzer.salaries['1-3 года'].count
+
+
+def test_rebuild_reads_only_affected_levels_and_windows(tmp_path):
+    """Пересборка после изменения читает из состояния только затронутые уровень опыта и окна"""
+    vacancies = scrapy.generate_realistic_vacancies(2_000, seed=6, days=60)
+    state = scrapy.CrawlState(tmp_path / 'state.db')
+    scrapy.analyze_incremental([vacancies], state, trend_window='week')
+
+    changed = [dict(dict(vacancy), salary='900000 руб.') for vacancy in vacancies
+               if vacancy['experience'] == 'Без опыта'][:5]
+    read = []
+    summaries = state.summaries
+
+    def counting(*args, **kwargs):
+        for batch in summaries(*args, **kwargs):
+            read.append(len(batch))
+            yield batch
+
+    state.summaries = counting
+    analyzer = scrapy.analyze_incremental([changed], state, trend_window='week')
+    state.close()
+
+    current = {vacancy['id']: vacancy for vacancy in list(vacancies) + changed}
+    reference = scrapy.StreamingAnalyzer(trend_window='week').update(list(current.values()))
+    assert 0 < sum(read) < len(vacancies)
+    assert not analyzer.stale
+    assert scrapy.compare_analyzers(analyzer, reference) == []
+    for group in (analyzer.cube.rollup('experience'), analyzer.cube.rollup('company')):
+        assert np.isfinite(group['max'][group['salary_count'] > 0]).all()
+    assert analyzer.cube.rollup()['max'] == 900_000
+    assert analyzer.trends.to_dict() == reference.trends.to_dict()
+
+
+def test_state_without_index_columns_is_migrated(tmp_path):
+    """Таблица прежнего формата дополняется колонками уровня опыта и даты публикации"""
+    import sqlite3
+
+    path = tmp_path / 'state.db'
+    db = sqlite3.connect(path)
+    db.execute('CREATE TABLE vacancies (id TEXT PRIMARY KEY, content_hash TEXT, last_seen REAL, summary BLOB)')
+    db.execute("INSERT INTO vacancies VALUES ('1', 'x', 0, ?)",
+               ('{"experience": "1-3 года", "timestamp": "2026-10-01T10:00:00+0300"}',))
+    db.commit()
+    db.close()
+
+    state = scrapy.CrawlState(path)
+    assert state.db.execute('SELECT experience, published FROM vacancies').fetchall() == [('1-3 года', '2026-10-01')]
+    assert [len(batch) for batch in state.summaries(levels=['1-3 года'])] == [1]
+    assert list(state.summaries(levels=['Нет опыта'])) == []
+    state.close()
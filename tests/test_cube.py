@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import scrapy
+
+
+@pytest.fixture
+def columns():
+    return scrapy.generate_vacancy_columns(3_000, seed=13)
+
+
+@pytest.fixture
+def frame(columns):
+    frame = pd.DataFrame({dim: np.asarray(columns.categories[dim], dtype=object)[columns[dim]]
+                          for dim in ('experience', 'employment', 'company')})
+    frame['salary'] = scrapy.average_salaries(columns['salary_from'], columns['salary_to'])
+    return frame
+
+
+def _as_frame(result, dims):
+    index = pd.MultiIndex.from_product([result['axes'][dim] for dim in dims], names=dims)
+    return pd.DataFrame({name: result[name].ravel() for name in ('count', 'mean', 'min', 'max')}, index=index)
+
+
+def test_rollup_matches_groupby(columns, frame):
+    """Свертки и срезы куба совпадают с группировкой по вакансиям"""
+    cube = scrapy.AggregationCube.from_columns(columns)
+    dims = ['experience', 'employment']
+    result = _as_frame(cube.rollup(dims), dims)
+    expected = frame.groupby(dims)['salary'].agg(['size', 'mean', 'min', 'max'])
+    result = result.loc[expected.index]
+    assert result['count'].tolist() == expected['size'].tolist()
+    assert result['mean'].to_numpy() == pytest.approx(expected['mean'].to_numpy())
+    assert result['min'].tolist() == expected['min'].tolist()
+    assert result['max'].tolist() == expected['max'].tolist()
+
+    company = frame['company'].iloc[0]
+    sliced = cube.rollup('experience', company=company)
+    expected = frame[frame['company'] == company].groupby('experience').size()
+    counts = dict(zip(sliced['axes']['experience'], sliced['count'].tolist()))
+    assert {level: count for level, count in counts.items() if count} == expected.to_dict()
+    assert cube.rollup()['count'] == len(frame)
+
+
+def test_technology_rollup_counts_mentions(columns):
+    """Свертка по технологии считает упоминания, остальные свертки - вакансии без двойного счета"""
+    cube = scrapy.AggregationCube.from_columns(columns)
+    technologies = scrapy.analyze_vacancies(columns).technologies
+    assert dict(cube.top('technology', n=len(technologies))) == dict(technologies)
+    assert cube.rollup(('technology', 'experience'))['count'].sum() == sum(technologies.values())
+    with pytest.raises(ValueError):
+        cube.rollup('city')
+
+
+def test_merge_save_load_and_axis_limit(columns, tmp_path, monkeypatch):
+    """Куб половин равен кубу целого, переживает save/load; лишние метки сворачиваются в 'Другие'"""
+    whole = scrapy.AggregationCube.from_columns(columns)
+    merged = scrapy.AggregationCube.from_columns(columns.slice(0, 1_000)) \
+        .merge(scrapy.AggregationCube.from_columns(columns.slice(1_000, 3_000)))
+    whole.save(tmp_path / 'cube.npz')
+    loaded = scrapy.AggregationCube.load(tmp_path / 'cube.npz')
+    for cube in (merged, loaded):
+        # compare_analyzers выравнивает оси кубов с разным порядком меток
+        assert scrapy.compare_analyzers(_with_cube(cube), _with_cube(whole)) == []
+        assert cube.rollup()['min'] == whole.rollup()['min']
+        assert cube.rollup()['max'] == whole.rollup()['max']
+
+    monkeypatch.setitem(scrapy.CUBE_AXIS_LIMITS, 'company', 3)
+    limited = scrapy.AggregationCube.from_columns(columns)
+    assert len(limited.axes['company']) == 4 and limited.axes['company'][-1] == scrapy.CUBE_OTHER
+    assert limited.rollup()['count'] == len(columns)
+
+
+def _with_cube(cube):
+    analyzer = scrapy.StreamingAnalyzer(cooccurrence=False)
+    analyzer.cube = cube
+    return analyzer
@@ -0,0 +1,43 @@
+import pytest
+
+import scrapy
+
+pytest.importorskip('pyarrow')
+
+
+def _vacancies(count):
+    vacancies = scrapy.generate_realistic_vacancies(count, seed=1)
+    return [dict(vacancy, id=i, company=f'Компания {i}', title=f'Должность {i}')
+            for i, vacancy in enumerate(vacancies)]
+
+
+def test_dataset_many_categories(tmp_path):
+    """Больше 256 компаний и должностей в одной пачке не переполняют индексы словаря"""
+    vacancies = _vacancies(300)
+
+    assert scrapy.write_vacancy_dataset(vacancies, tmp_path) == 300
+
+    table = scrapy.read_vacancy_dataset(tmp_path)
+    assert table.num_rows == 300
+    assert set(table['company'].to_pylist()) == {f'Компания {i}' for i in range(300)}
+    assert set(table['title'].to_pylist()) == {f'Должность {i}' for i in range(300)}
+
+
+def test_dataset_round_trip(tmp_path):
+    """Две дозаписи читаются обратно теми же значениями, анализ датасета совпадает с анализом в памяти"""
+    first = scrapy.generate_vacancy_columns(400, seed=3, days=10)
+    second = scrapy.generate_vacancy_columns(300, seed=4, start_id=401, days=10)
+    for columns in (first, second):
+        scrapy.write_vacancy_dataset(columns, tmp_path)
+
+    table = scrapy.read_vacancy_dataset(tmp_path).sort_by('id')
+    expected = scrapy.concat_vacancy_columns([first, second]).rows()
+    assert table['id'].to_pylist() == list(range(1, 701))
+    for field in ('title', 'company', 'experience', 'employment'):
+        assert table[field].to_pylist() == [vacancy[field] for vacancy in expected]
+    assert [sorted(skills) for skills in table['skills'].to_pylist()] == \
+        [sorted(vacancy['skills']) for vacancy in expected]
+
+    analyzer = scrapy.analyze_dataset(tmp_path, batch_size=128)
+    reference = scrapy.StreamingAnalyzer().update(first).update(second)
+    assert scrapy.compare_analyzers(analyzer, reference) == []
@@ -0,0 +1,24 @@
+import gzip
+import json
+
+import scrapy
+
+
+def test_files_stream_in_batches(tmp_path):
+    """Страница поиска JSON, список в подкаталоге и JSONL.gz читаются потоком пачками"""
+    raw = [scrapy.to_hh_vacancy(vacancy) for vacancy in scrapy.generate_realistic_vacancies(60, seed=11)]
+    (tmp_path / 'page.json').write_text(json.dumps({'items': raw[:20]}, ensure_ascii=False), encoding='utf-8')
+    (tmp_path / 'nested').mkdir()
+    (tmp_path / 'nested' / 'list.json').write_text(json.dumps(raw[20:35], ensure_ascii=False), encoding='utf-8')
+    with gzip.open(tmp_path / 'rest.jsonl.gz', 'wt', encoding='utf-8') as f:
+        f.writelines(json.dumps(item, ensure_ascii=False) + '\n\n' for item in raw[35:])
+    (tmp_path / 'notes.txt').write_text('не вакансии')
+
+    batches = list(scrapy.iter_vacancy_batches(tmp_path, batch_size=8))
+    assert [len(batch) for batch in batches] == [8] * 7 + [4]
+    records = [record for batch in batches for record in batch]
+    assert sorted(record['id'] for record in records) == sorted(item['id'] for item in raw)
+    assert all(isinstance(record['salary'], str) and isinstance(record['skills'], list) for record in records)
+
+    expected = scrapy.StreamingAnalyzer().update([scrapy.normalize_vacancy(item) for item in raw])
+    assert scrapy.compare_analyzers(scrapy.analyze_files(tmp_path, batch_size=8), expected) == []
@@ -0,0 +1,54 @@
+import functools
+from datetime import datetime
+
+import pytest
+
+import scrapy
+
+
+def test_parallel_matches_single_process(capsys):
+    """--verify: шардированный анализ совпадает с однопроцессным"""
+    columns = scrapy.generate_vacancy_columns(20_000, seed=5, days=30)
+    parallel = scrapy.analyze_parallel(columns, workers=2, batch_size=3_000, verify=True, trend_window='week')
+    assert 'совпадает с однопроцессным' in capsys.readouterr().out
+
+    single = scrapy.StreamingAnalyzer().update(columns)
+    assert scrapy.compare_analyzers(parallel, single) == []
+    assert parallel.total_vacancies == 20_000
+    assert sum(window.total for window in parallel.trends.windows.values()) == 20_000
+
+
+def _chunks(count, seed, compress, workers=1):
+    encode = functools.partial(scrapy._encode_generated_chunk, jsonl=True, compress=compress)
+    return [data for _, data in scrapy.generate_vacancy_chunks(count, seed, chunk_size=700, days=30, workers=workers,
+                                                               now=datetime(2026, 10, 1), encode=encode)]
+
+
+def test_parallel_workers_agree_on_generated_files(tmp_path):
+    """workers=1 и workers=3 на .gz из нескольких пачек и JSONL с диапазонами байт дают одни агрегаты"""
+    chunks = _chunks(3_000, 8, compress=True)
+    assert len(chunks) == 5
+    # Генерация не зависит от числа воркеров; каждая пачка - отдельный член gzip
+    assert _chunks(3_000, 8, compress=True, workers=2) == chunks
+    (tmp_path / 'a.jsonl.gz').write_bytes(b''.join(chunks))
+    (tmp_path / 'b.jsonl').write_bytes(b''.join(_chunks(2_000, 9, compress=False)))
+
+    shards = scrapy.make_shards(tmp_path, 3)
+    assert sum(1 for path, start, _ in shards if path.endswith('b.jsonl')) > 1
+
+    single = scrapy.analyze_parallel(tmp_path, workers=1, batch_size=500, trend_window='week')
+    parallel = scrapy.analyze_parallel(tmp_path, workers=3, batch_size=500, trend_window='week')
+    assert single.total_vacancies == parallel.total_vacancies == 5_000
+    assert scrapy.compare_analyzers(parallel, single) == []
+    for level, stats in single.salaries.items():
+        for q in (0.25, 0.5, 0.75):
+            assert parallel.salaries[level].quantile(q) == pytest.approx(stats.quantile(q), rel=0.01)
+
+    cubes = [analyzer.cube.rollup('experience') for analyzer in (single, parallel)]
+    order = [cubes[1]['axes']['experience'].index(level) for level in cubes[0]['axes']['experience']]
+    assert cubes[0]['count'].tolist() == cubes[1]['count'][order].tolist()
+    assert cubes[0]['mean'] == pytest.approx(cubes[1]['mean'][order])
+    assert single.cube.rollup()['count'] == 5_000
+
+    assert single.trends.windows.keys() == parallel.trends.windows.keys()
+    assert all(single.trends.windows[start].total == window.total for start, window in parallel.trends.windows.items())
@@ -0,0 +1,52 @@
+import pytest
+
+import scrapy
+
+
+@pytest.mark.parametrize('text, expected', [
+    # вилки и основной формат
+    ('120000-180000 руб.', (120000, 180000, 'RUR', None)),
+    ('100 000 - 150 000 ₽', (100000, 150000, 'RUR', None)),
+    ('100.000-150.000 руб', (100000, 150000, 'RUR', None)),
+    ('180000-120000 руб.', (120000, 180000, 'RUR', None)),
+    # от/до
+    ('от 90000 руб.', (90000, None, 'RUR', None)),
+    ('до 200 000 руб.', (None, 200000, 'RUR', None)),
+    ('от 80 000 до 120 000 руб.', (80000, 120000, 'RUR', None)),
+    ('up to 5000 USD', (None, 5000, 'USD', None)),
+    # дробная часть
+    ('90000.50 руб', (90000, None, 'RUR', None)),
+    ('90 000,50 руб', (90000, None, 'RUR', None)),
+    ('от 100000.99 до 150000.01 руб', (100001, 150000, 'RUR', None)),
+    # тыс/k
+    ('150к', (150000, None, 'RUR', None)),
+    ('от 2,5 тыс $', (2500, None, 'USD', None)),
+    ('100-150 тыс. руб.', (100000, 150000, 'RUR', None)),
+    ('от 1,5 до 2 тыс. $', (1500, 2000, 'USD', None)),
+    ('200k-300k EUR', (200000, 300000, 'EUR', None)),
+    # валюты
+    ('3,000 USD', (3000, None, 'USD', None)),
+    ('1500 €', (1500, None, 'EUR', None)),
+    ('от 500 000 тенге', (500000, None, 'KZT', None)),
+    ('2000 byn', (2000, None, 'BYR', None)),
+    # на руки / до вычета
+    ('100 000 - 150 000 руб. на руки', (100000, 150000, 'RUR', False)),
+    ('до 200k EUR gross', (None, 200000, 'EUR', True)),
+    ('от 80 000 до 120 000 KZT до вычета налогов', (80000, 120000, 'KZT', True)),
+    # без суммы
+    ('по договоренности', (None, None, None, None)),
+    ('', (None, None, None, None)),
+    (None, (None, None, None, None)),
+])
+def test_parse_salary(text, expected):
+    assert scrapy.parse_salary(text) == expected
+
+
+def test_parse_salaries_normalizes_to_gross_rubles():
+    """Векторный разбор: пересчет по курсу и из "на руки" в "до вычета" (НДФЛ 13%)"""
+    frame = scrapy.parse_salaries(['100000-200000 руб.', '1000 USD', '87000 руб. на руки', '90000.50 руб', ''],
+                                  rates={'RUR': 1.0, 'USD': 90.0})
+    assert frame['salary_from'].tolist() == [100000, 90000, 100000, 90000, 0]
+    assert frame['salary_to'].tolist() == [200000, 0, 0, 0, 0]
+    assert frame['currency'].tolist()[:4] == ['RUR', 'USD', 'RUR', 'RUR']
+    assert frame['currency'].isna().tolist()[4]
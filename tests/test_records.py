@@ -0,0 +1,44 @@
+import json
+
+import numpy as np
+
+import scrapy
+
+
+def test_compact_columns_keep_rows():
+    """Компактный набор (маски навыков, узкие коды) отдает те же строки и тот же анализ"""
+    vacancies = scrapy.generate_realistic_vacancies(2_000, seed=14, days=10)
+    columns = scrapy.vacancies_to_columns([vacancy.to_dict() for vacancy in vacancies])
+    compact = columns.compact()
+    assert 'skill_mask' in compact.arrays and 'skills' not in compact.arrays
+    assert compact.arrays['experience'].dtype == np.int8
+    assert compact.nbytes() < columns.nbytes()
+    assert columns.compact(descriptions=False).nbytes() < compact.nbytes() / 2
+    for i in (0, 1, 999, 1_999):
+        row = compact.row(i)
+        assert sorted(row.pop('skills')) == sorted(columns.skill_names(i))
+        assert row == {name: value for name, value in columns.row(i).items() if name != 'skills'}
+    assert scrapy.compare_analyzers(scrapy.StreamingAnalyzer().update(compact),
+                                    scrapy.StreamingAnalyzer().update(columns)) == []
+
+
+def test_vacancy_record_is_a_mapping():
+    """VacancyRecord ведет себя как словарь вакансии и не хранит своих полей"""
+    rows = scrapy.generate_vacancy_columns(10, seed=15).rows()
+    record = rows[3]
+    assert not hasattr(record, '__dict__')
+    assert dict(record) == record.to_dict() == rows.columns.row(3)
+    assert record.get('company') == record['company'] and record.get('city') is None
+    assert list(record) == list(scrapy.VACANCY_FIELDS)
+    assert rows[-1]['id'] == 10 and [vacancy['id'] for vacancy in rows[2:5]] == [3, 4, 5]
+
+
+def test_load_vacancies_concats_batches(tmp_path):
+    """Файлы загружаются пачками в один компактный набор с общими словарями категорий"""
+    vacancies = scrapy.generate_realistic_vacancies(250, seed=16)
+    (tmp_path / 'vacancies.jsonl').write_text(
+        ''.join(json.dumps(vacancy.to_dict(), ensure_ascii=False) + '\n' for vacancy in vacancies), encoding='utf-8')
+    loaded = scrapy.load_vacancies(tmp_path, batch_size=60, descriptions=False)
+    assert len(loaded) == 250 and 'description' not in loaded.arrays
+    assert loaded.labels('company').tolist() == [vacancy['company'] for vacancy in vacancies]
+    assert [sorted(loaded.skill_names(i)) for i in range(250)] == [sorted(vacancy['skills']) for vacancy in vacancies]
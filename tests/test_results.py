@@ -0,0 +1,79 @@
+import pytest
+
+import scrapy
+
+
+def _results(total, date):
+    return {'summary': {'total_vacancies': total, 'analysis_date': date},
+            'top_technologies': {'Python': total},
+            'performance': {'measured_speed': date}}
+
+
+@pytest.mark.parametrize('format, suffix', [('json', 'json'), ('msgpack', 'msgpack'), ('sqlite', 'db')])
+def test_changed_only_ignores_volatile_fields(tmp_path, format, suffix):
+    """Дата анализа и замеры запуска не делают результаты изменившимися"""
+    path = tmp_path / f'results.{suffix}'
+    sink = scrapy.open_result_sink(path, format, changed_only=True)
+    assert sink.write(_results(10, '2026-01-01')) == ['summary', 'top_technologies', 'performance']
+    assert sink.write(_results(10, '2026-01-02')) == []
+    sink.close()
+
+    # Дайджесты восстанавливаются из хранилища новым приемником
+    sink = scrapy.open_result_sink(path, format, changed_only=True)
+    assert sink.write(_results(10, '2026-01-03')) == []
+    assert sink.write(_results(11, '2026-01-04')) == ['summary', 'top_technologies', 'performance']
+    sink.close()
+    assert scrapy.load_results(path, format)['summary']['total_vacancies'] == 11
+
+
+def test_json_history_is_jsonl(tmp_path):
+    """История JSON пишется в *.jsonl, последнее состояние - повтор снимков; *.json для истории - ошибка"""
+    with pytest.raises(ValueError, match='jsonl'):
+        scrapy.open_result_sink(tmp_path / 'results.json', history=True)
+
+    sink = scrapy.open_result_sink(tmp_path / 'results.jsonl', history=True, changed_only=True)
+    sink.write(_results(10, '2026-01-01'))
+    sink.write(_results(12, '2026-01-02'))
+    sink.close()
+
+    assert sink.path == str(tmp_path / 'results.jsonl')
+    assert len(list(sink.snapshots())) == 2
+    assert scrapy.load_results(tmp_path / 'results.jsonl', history=True)['top_technologies'] == {'Python': 12}
+
+
+def test_cli_history_output(capsys):
+    """--history без --output пишет в *.jsonl, с --output *.json - ошибка разбора аргументов"""
+    assert scrapy.parse_args(['save', '--history']).output == 'scrapy_hh_analysis.jsonl'
+    assert scrapy.parse_args(['save']).output == 'scrapy_hh_analysis.json'
+    assert scrapy.parse_args(['save', '--history', '--format', 'msgpack']).output == 'scrapy_hh_analysis.json'
+    with pytest.raises(SystemExit):
+        scrapy.parse_args(['save', '--history', '--output', 'foo.json'])
+    assert 'foo.json' in capsys.readouterr().err
+
+
+def test_result_sink_is_abstract():
+    with pytest.raises(TypeError):
+        scrapy.ResultSink('results.json')
+
+
+@pytest.mark.parametrize('format, suffix', [('json', 'jsonl'), ('msgpack', 'msgpack'), ('sqlite', 'db')])
+def test_history_round_trip(tmp_path, format, suffix):
+    """История с changed_only хранит только изменившиеся разделы, повтор снимков дает последнее состояние"""
+    path = tmp_path / f'results.{suffix}'
+    sink = scrapy.open_result_sink(path, format, history=True, changed_only=True)
+    assert sink.write(_results(10, '2026-01-01')) == ['summary', 'top_technologies', 'performance']
+    # Замеры запуска (полностью изменчивый раздел) пишутся вместе с изменившимися разделами
+    assert sink.write(dict(_results(10, '2026-01-02'), top_technologies={'Go': 3})) == \
+        ['top_technologies', 'performance']
+    assert sink.write(_results(11, '2026-01-03')) == ['summary', 'top_technologies', 'performance']
+    assert sink.write(_results(11, '2026-01-04')) == []
+    sink.close()
+
+    sink = scrapy.open_result_sink(path, format, history=True)
+    snapshots = list(sink.snapshots())
+    sink.close()
+    assert [sorted(sections) for _, sections in snapshots] == \
+        [['performance', 'summary', 'top_technologies'], ['performance', 'top_technologies'],
+         ['performance', 'summary', 'top_technologies']]
+    latest = scrapy.load_results(path, format, history=True)
+    assert latest == _results(11, '2026-01-03')
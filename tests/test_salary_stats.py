@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+import scrapy
+
+
+@pytest.fixture
+def salaries():
+    return np.random.default_rng(0).lognormal(11.5, 0.4, size=20_000)
+
+
+def test_tdigest_merge_matches_single_digest(salaries):
+    """Слияние дайджестов частей дает те же квантили, что дайджест всех значений"""
+    whole = scrapy.TDigest(200)
+    whole.update(salaries)
+    merged = scrapy.TDigest(200)
+    for part in np.array_split(salaries, 7):
+        digest = scrapy.TDigest(200)
+        digest.update(part)
+        merged.merge(digest)
+
+    assert len(merged) == len(salaries)
+    for q in (0.1, 0.25, 0.5, 0.75, 0.9):
+        exact = np.quantile(salaries, q)
+        assert merged.quantile(q) == pytest.approx(exact, rel=0.01)
+        assert whole.quantile(q) == pytest.approx(exact, rel=0.01)
+
+
+def test_salary_stats_merge(salaries):
+    """Моменты и min/max слияния точные, медиана - в пределах точности t-digest"""
+    merged = scrapy.SalaryStats()
+    for part in np.array_split(salaries, 5):
+        stats = scrapy.SalaryStats()
+        stats.update(part)
+        merged.merge(stats)
+
+    assert merged.count == len(salaries)
+    assert merged.total == pytest.approx(salaries.sum())
+    assert merged.mean == pytest.approx(salaries.mean())
+    assert merged.std == pytest.approx(salaries.std())
+    assert (merged.min, merged.max) == (salaries.min(), salaries.max())
+    assert merged.median == pytest.approx(np.median(salaries), rel=0.01)
+
+
+def test_salary_stats_remove(salaries):
+    """Вычитание пересчитывает моменты точно, квантили - stale до rebuild"""
+    stats = scrapy.SalaryStats()
+    stats.update(salaries)
+    stats.remove(salaries[:5_000])
+    rest = salaries[5_000:]
+
+    assert stats.count == len(rest)
+    assert stats.mean == pytest.approx(rest.mean())
+    assert stats.std == pytest.approx(rest.std())
+    assert stats.stale and np.isnan(stats.median) and np.isnan(stats.max)
+
+    # Stale переходит в результат слияния
+    assert scrapy.SalaryStats().merge(stats).stale
+
+    stats.rebuild(rest)
+    assert not stats.stale
+    assert stats.median == pytest.approx(np.median(rest), rel=0.01)
+    assert (stats.min, stats.max) == (rest.min(), rest.max())
+
+
+def test_salary_stats_remove_all(salaries):
+    """Вычитание всех значений возвращает пустую, не stale статистику"""
+    stats = scrapy.SalaryStats()
+    stats.update(salaries[:100])
+    stats.remove(salaries[:100])
+    assert (stats.count, stats.total, stats.stale) == (0, 0.0, False)
+    assert stats.median == 0.0
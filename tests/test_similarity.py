@@ -0,0 +1,65 @@
+import pytest
+
+import scrapy
+
+pytest.importorskip('sklearn')
+
+
+def test_tfidf_cache_refits_changed_texts(tmp_path):
+    """Сохраненная матрица TF-IDF не переиспользуется, если при тех же id изменились тексты"""
+    path = tmp_path / 'tfidf'
+    vacancies = scrapy.generate_realistic_vacancies(200, seed=1)
+    engine = scrapy.get_similarity_engine(vacancies, path)
+    assert scrapy.get_similarity_engine(vacancies, path).digest == engine.digest
+
+    changed = [dict(vacancy) for vacancy in vacancies]
+    changed[0]['description'] = 'Haskell Erlang Elixir'
+    refitted = scrapy.get_similarity_engine(changed, path)
+    assert refitted.digest != engine.digest
+    assert 'haskell' in refitted.vectorizer.vocabulary_
+    assert scrapy.SimilarityEngine.load(path).digest == refitted.digest
+
+
+def test_vacancy_index_syncs_changed_and_removed(tmp_path):
+    """open_vacancy_index: изменившиеся вакансии переиндексируются, пропавшие удаляются"""
+    vacancies = scrapy.generate_realistic_vacancies(200, seed=1)
+    scrapy.open_vacancy_index(vacancies, tmp_path)
+
+    changed = [dict(vacancy) for vacancy in vacancies[:150]]
+    changed[0]['description'] = 'Haskell Erlang Elixir'
+    changed[0]['skills'] = ['Go']
+    index = scrapy.open_vacancy_index(changed, tmp_path)
+
+    assert len(index) == 150
+    assert set(index.ids[index.alive].tolist()) == {vacancy['id'] for vacancy in changed}
+
+    reopened = scrapy.VacancyIndex.load(tmp_path)
+    texts, ids = scrapy.vacancy_texts(changed)
+    assert sorted(reopened.ids.tolist()) == sorted(ids.tolist())
+    hashes = dict(zip(reopened.ids.tolist(), reopened.hashes.tolist()))
+    assert [hashes[vacancy_id] for vacancy_id in ids.tolist()] == scrapy.text_hashes(texts).tolist()
+    assert (changed[0]['id'], 1.0) in reopened.query(skills=['Go'], k=150)
+
+
+def test_vacancy_index_add_remove_save_load(tmp_path):
+    """Дельта-сегменты и tombstones переживают save/load; выдача не зависит от раскладки сегментов"""
+    vacancies = scrapy.generate_realistic_vacancies(300, seed=4)
+    index = scrapy.VacancyIndex.build(vacancies[:200])
+    index.add(vacancies[200:])
+    assert index.remove([vacancy['id'] for vacancy in vacancies[:50]]) == 50
+    assert len(index) == 250
+
+    query = {'skills': ['Python', 'Docker'], 'text': 'Python Django', 'k': 20}
+    before = index.query(**query)
+    assert all(vacancy_id > 50 for vacancy_id, _ in before)
+
+    index.save(tmp_path)
+    loaded = scrapy.VacancyIndex.load(tmp_path)
+    assert len(loaded) == 250 and loaded.alive.all()
+    after = loaded.query(**query)
+    assert [vacancy_id for vacancy_id, _ in after] == [vacancy_id for vacancy_id, _ in before]
+    assert [score for _, score in after] == pytest.approx([score for _, score in before])
+
+    # Повторное добавление id заменяет прежнюю версию
+    loaded.add(vacancies[60:61])
+    assert len(loaded) == 250
@@ -0,0 +1,10 @@
+import scrapy
+
+
+def test_matcher_aliases():
+    """Алиасы с точками остаются одним токеном и сводятся к канонической технологии"""
+    matcher = scrapy.get_technology_matcher()
+    assert matcher.find('Опыт ASP.NET Core, Node.js и Vue.js') == ['C#', 'JavaScript', 'Vue']
+    assert matcher.normalize('ASP.NET') == 'C#'
+    # java не находится внутри javascript, короткие алиасы - только в точном написании
+    assert matcher.find('javascript, GO, Go') == ['JavaScript', 'Go']
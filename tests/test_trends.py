@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+import scrapy
+
+
+def _vacancy(i, timestamp, salary, skills=('Python',), experience='1-3 года'):
+    return {'id': i, 'title': 'Разработчик', 'company': 'Яндекс', 'salary': f'{salary} руб.',
+            'experience': experience, 'employment': 'Полная занятость', 'description': '',
+            'skills': list(skills), 'timestamp': timestamp}
+
+
+@pytest.fixture
+def vacancies():
+    return [
+        _vacancy(1, '2026-10-05T10:00:00', 100_000),
+        _vacancy(2, '2026-10-07T10:00:00', 200_000, ('Python', 'Go')),
+        # 01:00 по Москве - воскресенье 4 октября по UTC, предыдущая неделя
+        _vacancy(3, '2026-10-05T01:00:00+0300', 300_000, ('Go',)),
+        _vacancy(4, '2026-10-19T10:00:00', 400_000, experience='3-6 лет'),
+        _vacancy(5, None, 500_000),
+    ]
+
+
+def test_week_windows(vacancies):
+    """Недели с понедельника по UTC; вакансии без даты не учитываются"""
+    trends = scrapy.TrendAggregator('week')
+    trends.update(vacancies)
+    starts = [str(start) for start in sorted(trends.windows)]
+    assert starts == ['2026-09-28', '2026-10-05', '2026-10-19']
+    week = trends.windows[np.datetime64('2026-10-05')]
+    assert (week.total, week.technologies['Python'], week.technologies['Go']) == (2, 2, 1)
+    assert week.salaries['experience']['1-3 года'].median == pytest.approx(150_000)
+
+    days = scrapy.TrendAggregator('day')
+    days.update(vacancies)
+    assert [str(start) for start in sorted(days.windows)] == ['2026-10-04', '2026-10-05', '2026-10-07', '2026-10-19']
+
+
+def test_series_fills_gaps_and_rolls(vacancies):
+    """Ряд идет по всем окнам подряд (пустые - нули и NaN), rolling суммирует последние окна"""
+    trends = scrapy.TrendAggregator('week')
+    trends.update(vacancies)
+    series = trends.series()
+    assert [str(start) for start in series['start']] == ['2026-09-28', '2026-10-05', '2026-10-12', '2026-10-19']
+    assert series['count'].tolist() == [1, 2, 0, 1]
+    assert np.isnan(series['median'][2])
+
+    rolling = trends.series(rolling=2)
+    assert rolling['count'].tolist() == [1, 3, 2, 1]
+    assert rolling['mean'][1] == pytest.approx(200_000)
+    assert trends.series(technology='Go', salaries=False)['count'].tolist() == [1, 1, 0, 0]
+    assert trends.series(level='3-6 лет')['median'].tolist()[-1] == pytest.approx(400_000)
+
+
+def test_merge_and_retract(vacancies):
+    """Слияние половин равно целому; вычитание уменьшает счетчики и делает квантили stale"""
+    whole = scrapy.TrendAggregator('week')
+    whole.update(vacancies)
+    merged = scrapy.TrendAggregator('week')
+    for part in (vacancies[:2], vacancies[2:]):
+        partial = scrapy.TrendAggregator('week')
+        partial.update(part)
+        merged.merge(partial)
+    assert merged.to_dict() == whole.to_dict()
+
+    whole.retract(vacancies[1:2])
+    week = whole.windows[np.datetime64('2026-10-05')]
+    assert (week.total, week.technologies['Go']) == (1, 0)
+    assert week.salaries['experience']['1-3 года'].stale
+    with pytest.raises(ValueError):
+        whole.merge(scrapy.TrendAggregator('day'))
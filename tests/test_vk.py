@@ -0,0 +1,86 @@
+import os
+from importlib.machinery import SourceFileLoader
+from importlib.util import module_from_spec, spec_from_loader
+
+import pytest
+
+# Загрузчик VK лежит в 2.1.txt, импортировать его по имени нельзя
+PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '2.1.txt')
+loader = SourceFileLoader('vk_members', PATH)
+vk = module_from_spec(spec_from_loader('vk_members', loader))
+loader.exec_module(vk)
+
+BATCH = vk.MAX_EXECUTE_CALLS * vk.MEMBERS_PER_CALL
+COUNT = 2 * BATCH + 10 * vk.MEMBERS_PER_CALL
+
+
+@pytest.fixture
+def stub():
+    servers = []
+
+    def start(members_count=COUNT, **options):
+        server, base_url = vk.start_stub_vk_server(members_count, **options)
+        servers.append(server)
+        return server, base_url
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def _analyzer(base_url, tmp_path, workers=3, rate=100):
+    return vk.VKGroupAnalyzer('token', 'group', base_url, str(tmp_path / 'checkpoint.json'), workers, rate)
+
+
+def _paged(base_url, members_count=COUNT):
+    """Агрегаты обычной постраничной загрузкой groups.getMembers, без execute и потоков"""
+    analyzer = vk.VKGroupAnalyzer('token', 'group', base_url, rate=100)
+    stats = vk.MemberStats()
+    for offset in range(0, members_count, vk.MEMBERS_PER_CALL):
+        data = analyzer.make_request('groups.getMembers', {'group_id': 'group', 'offset': offset,
+                                                          'count': vk.MEMBERS_PER_CALL,
+                                                          'fields': vk.MEMBER_FIELDS})
+        stats.update(data['response']['items'], first=offset == 0)
+    return stats.to_dict()
+
+
+def test_execute_matches_paged_fetch(stub, tmp_path):
+    """Параллельные пачки execute дают те же агрегаты и пример, что и постраничная загрузка"""
+    server, base_url = stub()
+    analyzer = _analyzer(base_url, tmp_path)
+    assert analyzer.fetch_all_members()
+    assert analyzer.stats.to_dict() == _paged(base_url)
+    assert [m['id'] for m in analyzer.stats.sample] == [1, 2, 3, 4, 5]
+    assert not os.path.exists(analyzer.checkpoint_path)
+
+
+def test_resume_from_checkpoint(stub, tmp_path, monkeypatch):
+    """Пачка, упавшая на внедренной ошибке, догружается следующим запуском с контрольной точки"""
+    monkeypatch.setattr(vk, 'MAX_RETRIES', 1)
+    # Один поток: запрос 1 - число участников, 2 и 3 - первые пачки, 4-й (последняя пачка) падает
+    server, base_url = stub(fail_every=4)
+    analyzer = _analyzer(base_url, tmp_path, workers=1)
+    assert not analyzer.fetch_all_members()
+    assert os.path.exists(analyzer.checkpoint_path)
+    assert analyzer.stats.total == 2 * BATCH
+
+    server, base_url = stub()
+    resumed = _analyzer(base_url, tmp_path, workers=1)
+    assert resumed.fetch_all_members()
+    # Повторно загружена только недостающая пачка
+    assert server.stats['calls'] == 1 + (COUNT - 2 * BATCH) // vk.MEMBERS_PER_CALL
+    assert resumed.stats.to_dict() == _paged(base_url)
+    assert not os.path.exists(resumed.checkpoint_path)
+
+
+def test_rate_limit_retries(stub, tmp_path):
+    """Ошибка 6 (слишком много запросов) повторяется, и загрузка все равно завершается"""
+    server, base_url = stub(members_count=2 * BATCH, rate=1)
+    analyzer = _analyzer(base_url, tmp_path)
+    assert analyzer.fetch_all_members()
+    # Три успешных запроса: число участников и две пачки, остальные отклонены стабом
+    assert server.stats['requests'] > 3
+    assert server.stats['calls'] == 1 + 2 * vk.MAX_EXECUTE_CALLS
+    assert analyzer.stats.total == 2 * BATCH
+    assert [m['id'] for m in analyzer.stats.sample] == [1, 2, 3, 4, 5]